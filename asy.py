@@ -1,47 +1,76 @@
 import asyncio
+import logging
+import selectors
 import signal
 import os
+import sys
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
 
 from postgres_access import AsyncPostgresAccess
 
+log = logging.getLogger(__name__)
+
+tracked_tasks = set()
+
+
+def spawn(coro, loop):
+    task = loop.create_task(coro)
+    tracked_tasks.add(task)
+    task.add_done_callback(tracked_tasks.discard)
+    return task
+
 
-async def catch_notify(queue, uri):
+async def bootstrap(queue, uri, workers_num):
+    loop = asyncio.get_event_loop()
+    # NOTE: Connections are established concurrently.
+    connections = await asyncio.gather(*[
+        AsyncPostgresAccess.create(uri, loop)
+        for _ in range(workers_num + 1)
+    ])
+    listener, workers = connections[0], connections[1:]
+    for number, pa in enumerate(workers, 1):
+        spawn(do_work(queue, pa, number), loop)
+    spawn(catch_notify(queue, listener), loop)
+
+
+async def catch_notify(queue, pa):
     try:
-        loop = asyncio.get_event_loop()
-        pa = await AsyncPostgresAccess.create(uri, loop)
-        with pa as db:
+        async with pa as db:
             await db.listen('task')
             while True:
                 notifications = await db.get_notifications()
-                print('Got notifications from Postgres', notifications)
+                if not notifications:
+                    continue
+                log.debug('Got notifications from Postgres %s', notifications)
                 for n in notifications:
-                    queue.put_nowait(n)
+                    await queue.put(n)
     except asyncio.CancelledError:
-        print('Notify receiver stopped.')
+        log.info('Notify receiver stopped.')
 
 
-async def do_work(queue, uri, number):
+async def do_work(queue, pa, number):
     try:
-        loop = asyncio.get_event_loop()
-        pa = await AsyncPostgresAccess.create(uri, loop)
-        with pa as db:
+        async with pa as db:
             while True:
                 notification = await queue.get()
-                print('Worker %s receive %s' % (number, notification))
+                log.debug('Worker %s receive %s', number, notification)
                 # simulating query
                 res = await db.execute('SELECT pg_sleep(5);', result=True)
-                print('Worker %s finish with result %s' % (number, res))
+                log.debug('Worker %s finish with result %s', number, res)
                 queue.task_done()
     except asyncio.CancelledError:
-        print('Worker %s stopped.' % number)
+        log.info('Worker %s stopped.', number)
 
 
 async def stop():
     loop = asyncio.get_event_loop()
-    tasks = [
-        t for t in asyncio.Task.all_tasks()
-        if t is not asyncio.tasks.Task.current_task()
-    ]
+    tasks = tracked_tasks - {asyncio.current_task()}
     for t in tasks:
         t.cancel()
     await asyncio.gather(*tasks, return_exceptions=True)
@@ -64,20 +93,37 @@ if __name__ == '__main__':
         print('Environment variable WORKERS_NUM must be an integer!!!')
         exit(1)
 
-    event_loop = asyncio.get_event_loop()
-    q = asyncio.Queue()
+    # NOTE: Records are written to stderr by listener thread,
+    #       so event loop does not block on output.
+    log_queue = SimpleQueue()
+    log_listener = QueueListener(log_queue, logging.StreamHandler())
+    logging.basicConfig(
+        level=logging.DEBUG if sys.flags.dev_mode else logging.INFO,
+        handlers=[QueueHandler(log_queue)]
+    )
+    log_listener.start()
+
+    if uvloop is not None:
+        event_loop = uvloop.new_event_loop()
+    elif hasattr(selectors, 'EpollSelector'):
+        event_loop = asyncio.SelectorEventLoop(selectors.EpollSelector())
+    else:
+        event_loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(event_loop)
+    # NOTE: Bounded queue stops reading of notifications while all
+    #       workers are busy.
+    q = asyncio.Queue(maxsize=workers_num * 4)
 
     for signame in ('SIGINT', 'SIGTERM'):
         event_loop.add_signal_handler(
             getattr(signal, signame),
-            lambda: asyncio.ensure_future(stop())
+            lambda: event_loop.create_task(stop())
         )
 
-    for i in range(1, workers_num + 1):
-        asyncio.ensure_future(do_work(q, settings['PG_URI'], i), loop=event_loop)
-    asyncio.ensure_future(catch_notify(q, settings['PG_URI']), loop=event_loop)
+    spawn(bootstrap(q, settings['PG_URI'], workers_num), event_loop)
 
     try:
         event_loop.run_forever()
     finally:
         event_loop.close()
+        log_listener.stop()
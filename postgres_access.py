@@ -1,62 +1,278 @@
 import asyncio
+import io
+import re
+import warnings
 
-from typing import Union, List, Callable
+from contextlib import asynccontextmanager
+from functools import lru_cache, partial
+from itertools import islice
+from typing import (
+    Any, AsyncIterator, Awaitable, Iterable, Sequence, Tuple,
+    Union, List, Callable
+)
 
-from psycopg2 import Error, connect
+from psycopg2 import Error, connect, sql
 from psycopg2.extensions import (
     POLL_OK, POLL_WRITE,
-    POLL_READ, Notify
+    POLL_READ, TRANSACTION_STATUS_IDLE, TRANSACTION_STATUS_INTRANS,
+    Notify, connection, encodings
 )
 from psycopg2.extras import DictCursor, DictRow
 
 from exceptions import DBException
 
+# NOTE: Postgres identifiers are truncated to 63 bytes.
+_CHANNEL_RE = re.compile(r'[A-Za-z_][A-Za-z0-9_]{0,62}')
+_VALUES_RE = re.compile(r'\bVALUES\s+%s', re.IGNORECASE)
+_PREPARABLE_RE = re.compile(
+    r'\s*(SELECT|INSERT|UPDATE|DELETE|VALUES|WITH)\b', re.IGNORECASE
+)
+_PLACEHOLDER_RE = re.compile(r'%%|%s')
+# NOTE: Limits of per connection statistics and prepared statements.
+_QUERY_COUNTS_MAX = 1000
+_PREPARED_MAX = 100
+# NOTE: SQLSTATE of EXECUTE whose plan is invalidated by schema change
+#       ('cached plan must not change result type').
+_STALE_PLAN_CODE = '0A000'
+# NOTE: Special characters of COPY text format.
+_COPY_ESCAPES = str.maketrans(
+    {'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'}
+)
+
+
+@lru_cache(maxsize=128)
+def _split_values_query(query: str) -> Tuple[str, str]:
+    """Splits query around its single %s placeholder of VALUES list,
+    escaped %% are turned to % as query is executed without parameters.
+
+    :param query: sql query, e.g. 'INSERT INTO t (a, b) VALUES %s'
+    :return: parts of query before and after placeholder
+    """
+    parts = query.replace('%%', '\0').split('%s')
+    if len(parts) != 2:
+        raise DBException(
+            'Query must contain exactly one %%s placeholder: %s' % query
+        )
+    pre, post = parts
+    return pre.replace('\0', '%'), post.replace('\0', '%')
+
+
+def _to_positional(query: str) -> Tuple[str, int]:
+    """Converts %s placeholders of query to $1, $2 ... placeholders
+    of server-side prepared statement.
+
+    :param query: sql query with %s placeholders
+    :return: converted query and number of placeholders
+    """
+    count = 0
+
+    def replace(match):
+        nonlocal count
+        if match.group() == '%%':
+            return '%'
+        count += 1
+        return '$%d' % count
+
+    return _PLACEHOLDER_RE.sub(replace, query), count
+
+
+def _copy_text(value: Any) -> str:
+    """Formats value as text input of Postgres, bytes are written
+    in bytea hex format, lists as array literals, other values with str().
+
+    :param value: value of column, not None
+    :return: text representation of value
+    """
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return '\\x' + bytes(value).hex()
+    if isinstance(value, list):
+        return '{%s}' % ','.join(
+            'NULL' if item is None
+            else _copy_text(item) if isinstance(item, list)
+            else '"%s"' % _copy_text(item).replace(
+                '\\', '\\\\'
+            ).replace('"', '\\"')
+            for item in value
+        )
+    if isinstance(value, (dict, set, frozenset)):
+        raise DBException(
+            'Unsupported type of COPY value: %s' % type(value).__name__
+        )
+    return str(value)
+
+
+def _copy_line(row: Sequence) -> str:
+    """Formats row as line of COPY text format, None is written as NULL.
+
+    :param row: values of row
+    :return: line with tab separated values
+    """
+    return '\t'.join(
+        '\\N' if value is None else _copy_text(value).translate(_COPY_ESCAPES)
+        for value in row
+    ) + '\n'
 
-# TODO:
-#       - implement work with transactions
 
 class AsyncPostgresAccess:
     """Class for access postgres db in async mode.
-    NOTE: asynchronous connection is always in autocommit mode
-    Attention: work with the instances of the class
-    should be implemented in with statement. Creation of object must be done
-    with create method. Example of usage:
+    NOTE: asynchronous connection is always in autocommit mode,
+    explicit transactions are started with begin() or transaction()
+    Attention: work with the instances created by create method
+    should be implemented in async with statement, connection is closed
+    on exit from it. Connections taken from AsyncPostgresPool are closed
+    by the pool and must not be closed by caller. Creation of object must
+    be done with create method. Example of usage:
 
            postgres_access = await AsyncPostgresAccess.create(uri, loop)
-           with postgres_access as db:
+           async with postgres_access as db:
                result = await db.execute(...)
+
+    NOTE: instances have no __dict__, subclasses that add attributes
+    must declare their own __slots__.
     """
 
-    def __init__(self, uri: str, loop: asyncio.SelectorEventLoop):
+    __slots__ = (
+        '__conn', '__fd', '__loop', '__future', '__call', '__reading',
+        '__cur', '__tuple_cur', '__cur_execute', '__cur_fetchall',
+        '__cur_mogrify', '__tuple_execute', '__tuple_fetchall',
+        '__prepare_threshold', '__prepared', '__query_counts',
+        '__cursor_factory', '__streams', '__stream', '__listen_statements',
+        '__uri', '__closed', '__prepares'
+    )
+
+    def __init__(
+            self, uri: str, conn: connection,
+            loop: asyncio.SelectorEventLoop,
+            prepare_threshold: Union[None, int]=None,
+            cursor_factory: type=DictCursor
+    ):
         """
 
         :param uri: Postgres address
+        :param conn: asynchronous connection to Postgres
         :param loop: asyncio loop
+        :param prepare_threshold: number of executions of query after which
+            it is prepared on server, None disables preparing. Parameters
+            are sent to EXECUTE as literals and their types are fixed by
+            Postgres when query is prepared, so type of result may change
+            after warm-up, e.g. SELECT %s starts to return text. Statement
+            invalidated by schema change is dropped and prepared again
+        :param cursor_factory: cursor class for rows accessed by name,
+            RealDictCursor builds plain dicts and is cheaper than DictCursor
+            when rows are not accessed by index
         """
-        self.__conn = connect(uri, async=True)
+        self.__uri = uri
+        self.__conn = conn
+        self.__fd = self.__conn.fileno()
         self.__loop = loop
-        self.__event = asyncio.Event()
-        self.__retrieve_method = None
-        self.__result = None
-        self.__connected = False
+        self.__future = None
         self.__call = None
+        self.__reading = False
+        self.__prepare_threshold = prepare_threshold
+        # NOTE: Query text -> EXECUTE statement of prepared query.
+        self.__prepared = {}
+        self.__query_counts = {}
+        # NOTE: Counter of names of prepared statements, names of dropped
+        #       statements are not reused.
+        self.__prepares = 0
+        self.__cursor_factory = cursor_factory
+        self.__streams = 0
+        # NOTE: Cursor name of stream that owns connection.
+        self.__stream = None
+        # NOTE: Channel name -> LISTEN statement.
+        self.__listen_statements = {}
+        self.__closed = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.close()
 
     def __enter__(self):
+        warnings.warn(
+            'Use async with statement for AsyncPostgresAccess',
+            DeprecationWarning, stacklevel=2
+        )
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        pass
+        self.close()
+
+    @property
+    def closed(self) -> bool:
+        """Whether connection is closed by close method or is broken.
+
+        :return: True if connection can not be used
+        """
+        return self.__closed or bool(self.__conn.closed)
+
+    @property
+    def idle(self) -> bool:
+        """Whether connection has no request in progress, no stream and
+        no open transaction, so it can be handed out to another user.
+
+        :return: True if connection can be reused as is
+        """
+        return (
+            self.__call is None and self.__stream is None and
+            self.__conn.get_transaction_status() == TRANSACTION_STATUS_IDLE
+        )
+
+    def close(self) -> None:
+        """Closes cursors and connection to Postgres, unregisters
+        connection file descriptor from event loop. Repeated calls
+        do nothing, file descriptor number may be already reused
+        by another connection.
+
+        :return:
+        """
+        if self.__closed:
+            return
+        self.__closed = True
+        self.__loop.remove_reader(self.__fd)
+        self.__loop.remove_writer(self.__fd)
+        self.__reading = False
+        if self.__call is not None:
+            self.__call = None
+            if not self.__future.done():
+                self.__future.set_exception(
+                    DBException('Connection is closed')
+                )
+        self.__cur.close()
+        self.__tuple_cur.close()
+        self.__conn.close()
 
     @classmethod
-    async def create(cls, uri, loop):
+    async def create(
+            cls, uri, loop, prepare_threshold=None, cursor_factory=DictCursor
+    ):
         """Creates AsyncPostgresAccess instance and wait for connection
         to Postgres.
 
         :param uri: Postgres address
         :param loop: asyncio loop
+        :param prepare_threshold: number of executions of query after which
+            it is prepared on server, None disables preparing. Parameters
+            are sent to EXECUTE as literals and their types are fixed by
+            Postgres when query is prepared, so type of result may change
+            after warm-up, e.g. SELECT %s starts to return text. Statement
+            invalidated by schema change is dropped and prepared again
+        :param cursor_factory: cursor class for rows accessed by name
+            (DictCursor, RealDictCursor)
         :return: AsyncPostgresAccess instance
         """
-        instance = AsyncPostgresAccess(uri, loop)
+        # NOTE: Connection start resolves host name and may block,
+        #       so it is done in executor.
+        try:
+            conn = await loop.run_in_executor(
+                None, partial(connect, uri, async_=True)
+            )
+        except Error as e:
+            raise DBException(e)
+        instance = AsyncPostgresAccess(
+            uri, conn, loop, prepare_threshold, cursor_factory
+        )
         await instance.__init()
         return instance
 
@@ -65,140 +281,612 @@ class AsyncPostgresAccess:
 
         :return:
         """
-        self.__call = self.__wait_connection
         # NOTE: Multiple messaging between postgres and client while connecting.
-        self.__check()
-        await self.__wait_event()
-        self.__cur = self.__conn.cursor(cursor_factory=DictCursor)
+        await self.__wait_connection()
+        self.__cur = self.__conn.cursor(cursor_factory=self.__cursor_factory)
+        # NOTE: Plain cursor is used when rows are not needed by name,
+        #       it does not build row object for every row.
+        self.__tuple_cur = self.__conn.cursor()
+        # NOTE: Bound methods of cursors are resolved once for hot path.
+        self.__cur_execute = self.__cur.execute
+        self.__cur_fetchall = self.__cur.fetchall
+        self.__cur_mogrify = self.__cur.mogrify
+        self.__tuple_execute = self.__tuple_cur.execute
+        self.__tuple_fetchall = self.__tuple_cur.fetchall
+        # NOTE: Reader is registered once for the whole life of connection,
+        #       responses are dispatched to callback stored in self.__call.
+        self.__loop.add_reader(self.__fd, self.__dispatch)
+        self.__reading = True
 
-    async def __wait_event(self) -> None:
-        """Waits for events set.
+    async def __wait_connection(self) -> None:
+        """Waits for connection to Postgres, polls connection
+        until it is established.
 
         :return:
         """
-        await self.__event.wait()
-        self.__event.clear()
+        loop = self.__loop
+        # NOTE: Poll state -> methods that register and unregister
+        #       file descriptor until it is ready.
+        waiters = {
+            POLL_WRITE: (loop.add_writer, loop.remove_writer),
+            POLL_READ: (loop.add_reader, loop.remove_reader)
+        }
+        while (state := self.__poll()) != POLL_OK:
+            waiter = waiters.get(state)
+            if waiter is None:
+                raise DBException('poll() returned %s' % state)
+            await self.__wait_fd(*waiter)
 
-    def __wait_connection(self) -> None:
-        """Waits for connection to Postgres.
+    def __poll(self) -> int:
+        """Polls Postgres connection.
 
-        :return:
+        :return: state of connection (POLL_OK, POLL_READ, POLL_WRITE)
         """
-        if self.__connected:
-            self.__loop.remove_writer(self.__conn.fileno())
-            self.__event.set()
-        else:
-            self.__check()
+        try:
+            return self.__conn.poll()
+        except Error as e:
+            raise DBException(e)
 
-    def __check(self) -> None:
-        """Checks file descriptor state.
+    async def __wait_fd(self, add: Callable, remove: Callable) -> None:
+        """Waits once for readiness of Postgres connection file descriptor.
 
+        :param add: loop method that registers file descriptor
+            (add_reader, add_writer)
+        :param remove: loop method that unregisters file descriptor
+            (remove_reader, remove_writer)
         :return:
         """
-        state = self.__conn.poll()
-        if state == POLL_OK:
-            self.__connected = True
-            self.__call()
-        elif state == POLL_WRITE:
-            self.__loop.add_writer(self.__conn.fileno(), self.__call)
-        elif state == POLL_READ:
-            self.__loop.add_reader(self.__conn.fileno(), self.__call)
-        else:
-            raise DBException('poll() returned %s' % state)
+        future = self.__loop.create_future()
+        add(self.__fd, future.set_result, None)
+        try:
+            await future
+        finally:
+            remove(self.__fd)
 
     async def __execute(
                 self, query: str, params: Union[None, tuple],
-                exec_method: str
-        ) -> None:
+                execute: Callable, retrieve: Callable
+        ) -> Union[List[Union[DictRow, tuple]], int]:
         """Starts executing of query.
 
         :param query: sql query
         :param params: parameters of query
-        :param exec_method: method of execution
-            (execute, executemany, callproc ...)
-        :return:
+        :param execute: execute method of cursor that should run query
+        :param retrieve: function that returns result of query when
+            response is complete (fetchall of cursor, __retrieve_count)
+        :return: result of query
         """
-        self.__cursor_execute(query, params, exec_method)
-        await self.__do_by_response(self.__cursor_retrieve)
+        self.__cursor_execute(query, params, execute)
+        # NOTE: Response may be complete already, in that case it is
+        #       retrieved without waiting for the reader.
+        state = self.__poll()
+        if state == POLL_OK:
+            try:
+                return retrieve()
+            except Error as e:
+                raise DBException(e)
+        if state == POLL_WRITE:
+            self.__loop.add_writer(self.__fd, self.__flush)
+        return await self.__do_by_response(retrieve)
 
     def __cursor_execute(
-            self, query: str, params: tuple, method: str
-    ) -> Union[None, str]:
-        """Executes commands for cursor.
+            self, query: str, params: tuple, execute: Callable
+    ) -> None:
+        """Executes query with cursor.
 
         :param query: sql query
         :param params: parameters of query
-        :param method: execute method of cursor (execute, mogrify, callproc...)
-        :return: different methods returns different results
-            (execute - returns None, mogrify - returns query string ...)
+        :param execute: execute method of cursor
+        :return:
         """
         try:
-            return getattr(self.__cur, method)(query, params)
+            execute(query, params)
         except Error as e:
             raise DBException(e)
 
-    def __cursor_retrieve(self) -> None:
-        """Retrieves data from database,
-        used after executing query as a callback,
-        stores result in self.__result attribute
+    def __retrieve_count(self) -> int:
+        """Used after executing query without result as a callback.
+
+        :return: number of rows that query produced
+        """
+        return self.__tuple_cur.rowcount
+
+    def __check_idle(self) -> None:
+        """Checks that no other request waits for response on connection,
+        request future is not shared between concurrent callers.
 
         :return:
         """
-        try:
-            if self.__retrieve_method is None:
-                self.__result = self.__cur.rowcount
-            else:
-                self.__result = getattr(self.__cur, self.__retrieve_method)()
-            self.__event.set()
-        except Error as e:
-            raise DBException(e)
+        if self.__call is not None:
+            raise DBException('Another request is in progress on connection')
+        if self.__stream is not None:
+            raise DBException('Stream is in progress on connection')
 
-    async def __do_by_response(self, callback: Callable) -> None:
-        """Adds callback for read availability event from Postgres connection
-        file descriptor.
+    async def __do_by_response(self, callback: Callable) -> Any:
+        """Stores callback that should be called by persistent reader
+        of Postgres connection file descriptor when response is complete
+        and waits for its result.
 
         :param callback: function that should be called when
-            response come from Postgres. Callback must set
-            asyncio.Event() object stored in self.__ev attribute when work is
-            done, and must remove file descriptor of Postgres connection
-            from event loop.
-        :return:
+            response come from Postgres, its return value is the result
+            of the request.
+        :return: result of callback
         """
+        self.__future = self.__loop.create_future()
         self.__call = callback
-        self.__loop.add_reader(self.__conn.fileno(), self.__check)
-        await self.__wait_event()
+        if not self.__reading:
+            self.__loop.add_reader(self.__fd, self.__dispatch)
+            self.__reading = True
+        return await self.__future
 
-    def __retrieve_notifications(self) -> None:
-        """Used as callback for retrieving notifications from Postgres,
-        stores retrieved notifications to self.__result attribute.
+    def __dispatch(self) -> None:
+        """Persistent reader of Postgres connection file descriptor,
+        polls connection and calls callback stored in self.__call
+        when response is complete. Reader is paused when nobody waits
+        for response, so unread data stays in socket buffers until the
+        next request.
 
         :return:
         """
-        self.__conn.poll()
-        notifications = []
-        while self.__conn.notifies:
-            notification = self.__conn.notifies.pop()
-            notifications.append(notification)
-        self.__result = notifications
-        self.__event.set()
+        if self.__call is None:
+            self.__loop.remove_reader(self.__fd)
+            self.__reading = False
+            return
+        future = self.__future
+        try:
+            state = self.__conn.poll()
+            if state == POLL_OK:
+                call, self.__call = self.__call, None
+                result = call()
+        except Error as e:
+            self.__call = None
+            if not future.done():
+                future.set_exception(DBException(e))
+            return
+        if state == POLL_OK:
+            if not future.done():
+                future.set_result(result)
+        elif state == POLL_WRITE:
+            self.__loop.add_writer(self.__fd, self.__flush)
+        elif state != POLL_READ:
+            raise DBException('poll() returned %s' % state)
+
+    def __flush(self) -> None:
+        """Used as writer callback when query was not sent to Postgres
+        completely, polls connection until output buffer is flushed.
+
+        :return:
+        """
+        self.__loop.remove_writer(self.__fd)
+        self.__dispatch()
+
+    def __retrieve_notifications(self) -> List[Notify]:
+        """Used as callback for retrieving notifications from Postgres.
+
+        :return: list of notifications from Postgres
+        """
+        notifications = self.__conn.notifies
+        self.__conn.notifies = []
+        return notifications
 
     async def execute(
             self, query: str,
             params: Union[None, tuple]=None,
-            result: bool=False
-    ) -> Union[List[DictRow], int]:
+            result: bool=False,
+            dict_rows: bool=True
+    ) -> Union[List[Union[DictRow, tuple]], int]:
         """Executes query.
 
         :param query: sql query
         :param params: parameters of query
         :param result: flag to determine whether to return the query result,
             if False method returns number of rows produced by query
+        :param dict_rows: flag to determine whether rows of the result
+            should be made by cursor_factory (DictRow's by default),
+            if False rows are tuples
         :return: number of rows that query produced if result is None and list
-            of DictRow's if result is True
+            of DictRow's (tuples if dict_rows is False) if result is True
+        """
+        self.__check_idle()
+        statement = query
+        # NOTE: Query without parameters is sent as is, its % characters
+        #       are not placeholders.
+        if (self.__prepare_threshold is not None and params is not None and
+                isinstance(query, str)):
+            statement = await self.__prepare(query)
+        if not result:
+            execute, retrieve = self.__tuple_execute, self.__retrieve_count
+        elif dict_rows:
+            execute, retrieve = self.__cur_execute, self.__cur_fetchall
+        else:
+            execute, retrieve = self.__tuple_execute, self.__tuple_fetchall
+        if statement == query:
+            return await self.__execute(query, params, execute, retrieve)
+        try:
+            return await self.__execute(statement, params, execute, retrieve)
+        except DBException as e:
+            if getattr(e.args[0], 'pgcode', None) != _STALE_PLAN_CODE:
+                raise
+            if not await self.__deallocate(query):
+                raise
+        return await self.__execute(query, params, execute, retrieve)
+
+    @asynccontextmanager
+    async def execute_stream(
+            self, query: str,
+            params: Union[None, tuple]=None,
+            batch: int=1000,
+            dict_rows: bool=True
+    ) -> AsyncIterator[AsyncIterator[List[Union[DictRow, tuple]]]]:
+        """Executes query with server-side cursor and yields async iterator
+        over rows of the result in batches, so only one batch is held
+        in memory. Cursor lives in transaction, it is started and finished
+        by the method if connection is not in transaction already.
+        (named cursors are not available for asynchronous connections)
+        Cursor is closed on exit from async with statement, even if
+        iteration is stopped early, other requests are refused on
+        connection until then. Example of usage:
+
+               async with db.execute_stream(...) as batches:
+                   async for rows in batches:
+                       ...
+
+        :param query: sql query
+        :param params: parameters of query
+        :param batch: number of rows fetched from Postgres at once
+        :param dict_rows: flag to determine whether rows should be made
+            by cursor_factory, if False rows are tuples
+        :return: async iterator over lists of rows
+        """
+        self.__check_idle()
+        own_transaction = (
+            self.__conn.get_transaction_status() == TRANSACTION_STATUS_IDLE
+        )
+        self.__streams += 1
+        name = '_s%d' % self.__streams
+        if own_transaction:
+            await self.__begin()
+        self.__stream = name
+        declared = False
+        try:
+            await self.__execute(
+                'DECLARE %s NO SCROLL CURSOR FOR %s' % (name, query), params,
+                self.__tuple_execute, self.__retrieve_count
+            )
+            declared = True
+            yield self.__fetch_stream(name, batch, dict_rows)
+        except BaseException:
+            self.__stream = None
+            if own_transaction:
+                await self.__rollback_or_close()
+            elif self.__call is not None:
+                # NOTE: Cursor of outer transaction can not be closed
+                #       while response of cancelled request is not received.
+                self.close()
+            elif declared and (self.__conn.get_transaction_status() ==
+                               TRANSACTION_STATUS_INTRANS):
+                # NOTE: Aborted outer transaction drops cursor by itself.
+                await self.execute('CLOSE %s;' % name)
+            raise
+        self.__stream = None
+        if own_transaction:
+            await self.commit()
+        else:
+            await self.execute('CLOSE %s;' % name)
+
+    async def __fetch_stream(
+            self, name: str, batch: int, dict_rows: bool
+    ) -> AsyncIterator[List[Union[DictRow, tuple]]]:
+        """Fetches rows of stream cursor in batches until result
+        is exhausted.
+
+        :param name: name of server-side cursor
+        :param batch: number of rows fetched from Postgres at once
+        :param dict_rows: flag to determine whether rows should be made
+            by cursor_factory, if False rows are tuples
+        :return: async iterator over lists of rows
+        """
+        if dict_rows:
+            execute, retrieve = self.__cur_execute, self.__cur_fetchall
+        else:
+            execute, retrieve = self.__tuple_execute, self.__tuple_fetchall
+        fetch = 'FETCH %d FROM %s;' % (batch, name)
+        while True:
+            if self.__stream != name:
+                raise DBException('Stream is closed')
+            if self.__call is not None:
+                raise DBException(
+                    'Another request is in progress on connection'
+                )
+            rows = await self.__execute(fetch, None, execute, retrieve)
+            if not rows:
+                return
+            yield rows
+            if len(rows) < batch:
+                return
+
+    async def __prepare(self, query: str) -> str:
+        """Counts executions of query and prepares it on server when it is
+        executed prepare_threshold times, so Postgres parses and plans
+        it once.
+        NOTE: parameters are sent as literals to EXECUTE, types of
+        parameters are inferred by Postgres when query is prepared.
+        Schema change of tables used by query (ALTER TABLE, ...) may
+        invalidate prepared statement, it is dropped by __deallocate
+        and query is counted again.
+
+        :param query: sql query with %s placeholders, executed
+            with parameters
+        :return: query that should be executed instead of given one
+        """
+        statement = self.__prepared.get(query)
+        if statement is not None:
+            return statement
+        if '%(' in query or not _PREPARABLE_RE.match(query):
+            return query
+        count = self.__query_counts.get(query, 0) + 1
+        if count < self.__prepare_threshold:
+            if len(self.__query_counts) >= _QUERY_COUNTS_MAX:
+                self.__query_counts.clear()
+            self.__query_counts[query] = count
+            return query
+        # NOTE: Failed PREPARE would abort transaction in progress.
+        if (len(self.__prepared) >= _PREPARED_MAX or
+                self.__conn.get_transaction_status() !=
+                TRANSACTION_STATUS_IDLE):
+            return query
+        self.__query_counts.pop(query, None)
+        self.__prepares += 1
+        name = '_p%d' % self.__prepares
+        positional, count = _to_positional(query)
+        try:
+            await self.__execute(
+                'PREPARE %s AS %s' % (name, positional), None,
+                self.__tuple_execute, self.__retrieve_count
+            )
+        except DBException:
+            # NOTE: Query is executed as is from now on.
+            statement = query
+        else:
+            statement = 'EXECUTE %s' % name
+            if count:
+                statement += '(%s)' % ', '.join(['%s'] * count)
+        self.__prepared[query] = statement
+        return statement
+
+    async def __deallocate(self, query: str) -> bool:
+        """Drops prepared statement of query that failed because its plan
+        was invalidated by schema change, query is counted for preparing
+        again.
+
+        :param query: sql query with %s placeholders
+        :return: True if query can be executed again as is, False if
+            failed EXECUTE aborted transaction in progress
+        """
+        statement = self.__prepared.pop(query)
+        if (self.__conn.get_transaction_status() !=
+                TRANSACTION_STATUS_IDLE):
+            # NOTE: Nothing can be sent in aborted transaction, statement
+            #       stays allocated on server under unused name.
+            return False
+        name = statement[len('EXECUTE '):].partition('(')[0]
+        await self.__execute(
+            'DEALLOCATE %s' % name, None,
+            self.__tuple_execute, self.__retrieve_count
+        )
+        return True
+
+    async def execute_many(
+            self, query: str, seq_of_params: Iterable[Sequence],
+            template: Union[None, str]=None, page_size: int=100
+    ) -> int:
+        """Executes query for many rows, rows are sent in pages instead of
+        statement per row. Query with VALUES %s placeholder gets one
+        VALUES list statement per page, any other query is repeated for
+        every row of page and page is sent as one query string.
+        (executemany and psycopg2.extras.execute_values/execute_batch are
+        not available for asynchronous connections)
+
+        :param query: sql query, e.g. 'INSERT INTO t (a, b) VALUES %s'
+            or 'UPDATE t SET a = %s WHERE b = %s'
+        :param seq_of_params: sequence of rows parameters
+        :param template: template of one row for VALUES list,
+            e.g. '(%s, %s)', by default placeholder for every parameter
+            of row is used
+        :param page_size: maximum number of rows in one query
+        :return: number of rows that queries produced, only the last
+            statement of every page is counted for repeated query
+        """
+        if _VALUES_RE.search(query):
+            pre, post = _split_values_query(query)
+            sep = ','
+        else:
+            pre, post, sep, template = '', '', ';', query
+        codec = encodings[self.__conn.encoding]
+        rows = iter(seq_of_params)
+        count = 0
+        while True:
+            page = list(islice(rows, page_size))
+            if not page:
+                return count
+            try:
+                statement = sep.join(
+                    self.__cur_mogrify(
+                        template or '(%s)' % ','.join(['%s'] * len(args)),
+                        args
+                    ).decode(codec)
+                    for args in page
+                )
+            except Error as e:
+                raise DBException(e)
+            # NOTE: Page is one-off query, it is not counted for preparing.
+            self.__check_idle()
+            count += await self.__execute(
+                pre + statement + post, None,
+                self.__tuple_execute, self.__retrieve_count
+            )
+
+    async def copy_from(
+            self, table: str, rows: Iterable[Sequence],
+            columns: Union[None, Sequence[str]]=None,
+            options: Union[None, str]=None
+    ) -> int:
+        """Loads rows to table with COPY protocol, which is much faster
+        than INSERT for many rows. COPY is not available for asynchronous
+        connections, so it runs on separate synchronous connection
+        in executor and is committed independently of this connection.
+        NOTE: settings made on this connection (SET search_path in init
+        of AsyncPostgresPool, ...) do not apply to COPY connection,
+        qualify table with schema or pass settings with options.
+
+        :param table: table name, may be qualified with schema
+        :param rows: sequence of rows values, None is loaded as NULL,
+            bytes as bytea, lists as arrays, other values are written
+            with str(), dicts and sets are not supported
+        :param columns: names of columns that rows contain,
+            all columns of table by default
+        :param options: command-line options of COPY connection,
+            e.g. '-c search_path=app'
+        :return: number of loaded rows
+        """
+        statement = sql.SQL('COPY {} {}FROM STDIN').format(
+            sql.Identifier(*table.split('.')),
+            sql.SQL('') if columns is None else sql.SQL('({}) ').format(
+                sql.SQL(', ').join(map(sql.Identifier, columns))
+            )
+        )
+        return await self.__loop.run_in_executor(
+            None, self.__copy_sync, statement, rows, options
+        )
+
+    def __copy_sync(
+            self, statement: sql.Composed, rows: Iterable,
+            options: Union[None, str]
+    ) -> int:
+        """Runs COPY FROM STDIN on new synchronous connection,
+        used in executor.
+
+        :param statement: COPY statement
+        :param rows: sequence of rows values
+        :param options: command-line options of connection
+        :return: number of loaded rows
+        """
+        buffer = io.StringIO()
+        buffer.writelines(map(_copy_line, rows))
+        buffer.seek(0)
+        try:
+            # NOTE: None options are dropped from connection string.
+            conn = connect(self.__uri, options=options)
+            try:
+                # NOTE: Transaction is committed on exit from with.
+                with conn, conn.cursor() as cur:
+                    cur.copy_expert(statement.as_string(conn), buffer)
+                    return cur.rowcount
+            finally:
+                conn.close()
+        except Error as e:
+            raise DBException(e)
+
+    async def execute_pipeline(
+            self, queries: Iterable[Tuple[str, Union[None, tuple]]]
+    ) -> int:
+        """Sends several queries to Postgres as one query string, so they
+        are executed in one round trip instead of round trip per query.
+        Postgres runs them in one implicit transaction, if one query fails
+        none of them is applied. Results of queries are not returned.
+
+        :param queries: pairs of sql query and its parameters
+        :return: number of rows that the last query produced,
+            0 if there are no queries
+        """
+        self.__check_idle()
+        codec = encodings[self.__conn.encoding]
+        try:
+            statement = ';'.join(
+                self.__cur_mogrify(query, params).decode(codec)
+                for query, params in queries
+            )
+        except Error as e:
+            raise DBException(e)
+        if not statement:
+            return 0
+        return await self.__execute(
+            statement, None, self.__tuple_execute, self.__retrieve_count
+        )
+
+    async def begin(self) -> None:
+        """Starts transaction, statements are not committed until
+        commit is awaited.
+
+        :return:
+        """
+        await self.execute('BEGIN;')
+
+    async def commit(self) -> None:
+        """Commits transaction started with begin.
+
+        :return:
+        """
+        await self.execute('COMMIT;')
+
+    async def rollback(self) -> None:
+        """Rolls back transaction started with begin.
+
+        :return:
+        """
+        await self.execute('ROLLBACK;')
+
+    async def __begin(self) -> None:
+        """Starts transaction, connection is not left in transaction
+        if waiting for response of BEGIN is interrupted.
+
+        :return:
+        """
+        try:
+            await self.begin()
+        except DBException:
+            # NOTE: BEGIN was not sent or failed, no transaction is open.
+            raise
+        except BaseException:
+            await self.__rollback_or_close()
+            raise
+
+    async def __rollback_or_close(self) -> None:
+        """Rolls back transaction after error or cancellation. Connection
+        is closed if response of cancelled request is not received yet,
+        as ROLLBACK can not be sent and later statements would run
+        in unfinished transaction.
+
+        :return:
+        """
+        if self.__call is not None:
+            self.close()
+            return
+        try:
+            await self.rollback()
+        except BaseException:
+            self.close()
+            raise
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator['AsyncPostgresAccess']:
+        """Runs statements of async with block in transaction,
+        commits it on success and rolls it back on error or cancellation,
+        connection is closed if transaction can not be rolled back.
+        Example of usage:
+
+               async with db.transaction():
+                   await db.execute(...)
+
+        :return: AsyncPostgresAccess instance
         """
-        self.__retrieve_method = 'fetchall' if result else None
-        await self.__execute(query, params, 'execute')
-        return self.__result
+        await self.__begin()
+        try:
+            yield self
+        except BaseException:
+            await self.__rollback_or_close()
+            raise
+        await self.commit()
 
     async def listen(self, chanel) -> None:
         """Starts listening chanel.
@@ -206,7 +894,15 @@ class AsyncPostgresAccess:
         :param chanel: chanel to listen
         :return:
         """
-        await self.execute('LISTEN %s;' % chanel)
+        statement = self.__listen_statements.get(chanel)
+        if statement is None:
+            if not _CHANNEL_RE.fullmatch(chanel):
+                raise DBException('Invalid chanel name: %s' % chanel)
+            statement = sql.SQL('LISTEN {};').format(
+                sql.Identifier(chanel)
+            ).as_string(self.__conn)
+            self.__listen_statements[chanel] = statement
+        await self.execute(statement)
 
     async def get_notifications(self) -> List[Notify]:
         """Receives notifications from Postgres, adds callback for
@@ -214,5 +910,183 @@ class AsyncPostgresAccess:
 
         :return: list of notifications from Postgres
         """
-        await self.__do_by_response(self.__retrieve_notifications)
-        return self.__result
+        self.__check_idle()
+        if self.__conn.notifies:
+            # NOTE: Notifications were already read by persistent reader.
+            return self.__retrieve_notifications()
+        try:
+            return await self.__do_by_response(self.__retrieve_notifications)
+        except asyncio.CancelledError:
+            # NOTE: Nothing was sent to Postgres, connection can be reused.
+            self.__call = None
+            raise
+
+
+class AsyncPostgresPool:
+    """Pool of AsyncPostgresAccess connections, connections are opened
+    once and handed out to callers one at a time. Creation of object must
+    be done with create method. Example of usage:
+
+           pool = await AsyncPostgresPool.create(uri, size, loop)
+           async with pool.acquire() as db:
+               result = await db.execute(...)
+           pool.close()
+    """
+
+    __slots__ = (
+        '__uri', '__size', '__loop', '__setup', '__free',
+        '__prepare_threshold', '__cursor_factory', '__closed'
+    )
+
+    def __init__(
+            self, uri: str, size: int, loop: asyncio.SelectorEventLoop,
+            init: Union[None, Callable[[AsyncPostgresAccess], Awaitable]]=None,
+            prepare_threshold: Union[None, int]=None,
+            cursor_factory: type=DictCursor
+    ):
+        """
+
+        :param uri: Postgres address
+        :param size: number of connections in pool
+        :param loop: asyncio loop
+        :param init: coroutine function that is called once for every
+            connection when pool is created (SET search_path, ...)
+        :param prepare_threshold: prepare_threshold of every connection,
+            see AsyncPostgresAccess.create
+        :param cursor_factory: cursor_factory of every connection,
+            see AsyncPostgresAccess.create
+        """
+        self.__uri = uri
+        self.__size = size
+        self.__loop = loop
+        self.__setup = init
+        self.__prepare_threshold = prepare_threshold
+        self.__cursor_factory = cursor_factory
+        # NOTE: Most recently used connection is handed out first,
+        #       None stands for connection that should be opened again.
+        self.__free = asyncio.LifoQueue()
+        self.__closed = False
+
+    @classmethod
+    async def create(
+            cls, uri, size, loop, init=None,
+            prepare_threshold=None, cursor_factory=DictCursor
+    ):
+        """Creates AsyncPostgresPool instance and opens its connections.
+
+        :param uri: Postgres address
+        :param size: number of connections in pool
+        :param loop: asyncio loop
+        :param init: coroutine function that is called once for every
+            connection when pool is created
+        :param prepare_threshold: prepare_threshold of every connection
+        :param cursor_factory: cursor_factory of every connection
+        :return: AsyncPostgresPool instance
+        """
+        instance = AsyncPostgresPool(
+            uri, size, loop, init, prepare_threshold, cursor_factory
+        )
+        await instance.__init()
+        return instance
+
+    async def __init(self) -> None:
+        """Opens connections concurrently and puts them to pool,
+        connections that were opened are closed if any of them fails.
+
+        :return:
+        """
+        results = await asyncio.gather(
+            *[self.__open() for _ in range(self.__size)],
+            return_exceptions=True
+        )
+        errors = [r for r in results if isinstance(r, BaseException)]
+        if errors:
+            for db in results:
+                if isinstance(db, AsyncPostgresAccess):
+                    db.close()
+            raise errors[0]
+        for db in results:
+            self.__free.put_nowait(db)
+
+    async def __open(self) -> AsyncPostgresAccess:
+        """Opens connection of pool and runs init callback for it.
+
+        :return: AsyncPostgresAccess instance
+        """
+        db = await AsyncPostgresAccess.create(
+            self.__uri, self.__loop,
+            self.__prepare_threshold, self.__cursor_factory
+        )
+        if self.__setup is not None:
+            try:
+                await self.__setup(db)
+            except BaseException:
+                db.close()
+                raise
+        return db
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[AsyncPostgresAccess]:
+        """Takes connection from pool, waits if all connections are in use.
+        Connection is returned to pool on exit from async with statement,
+        transaction left open by caller is rolled back, connection that
+        is still busy, closed or broken is replaced with new one.
+
+        :return: AsyncPostgresAccess instance
+        """
+        if self.__closed:
+            raise DBException('Pool is closed')
+        db = await self.__free.get()
+        try:
+            if self.__closed:
+                raise DBException('Pool is closed')
+            if db is None or db.closed:
+                if db is not None:
+                    db.close()
+                    db = None
+                db = await self.__open()
+            yield db
+        finally:
+            try:
+                if db is not None and not (
+                        self.__closed or db.closed or db.idle):
+                    await self.__reset(db)
+            finally:
+                if db is not None and (self.__closed or db.closed):
+                    db.close()
+                    db = None
+                self.__free.put_nowait(db)
+
+    async def __reset(self, db: AsyncPostgresAccess) -> None:
+        """Rolls back transaction that caller left open on connection,
+        connection is closed if request is still in progress on it
+        or it can not be made idle.
+
+        :param db: connection returned to pool
+        :return:
+        """
+        try:
+            await db.rollback()
+        except DBException:
+            # NOTE: Request or stream is still in progress on connection.
+            db.close()
+        except BaseException:
+            db.close()
+            raise
+        if not db.closed and not db.idle:
+            db.close()
+
+    def close(self) -> None:
+        """Closes connections of pool, connections in use are closed
+        when they are returned to pool.
+
+        :return:
+        """
+        self.__closed = True
+        while not self.__free.empty():
+            db = self.__free.get_nowait()
+            if db is not None:
+                db.close()
+        # NOTE: Wakes up callers waiting for connection, each of them
+        #       puts None back for the next one.
+        self.__free.put_nowait(None)
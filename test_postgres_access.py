@@ -0,0 +1,92 @@
+import unittest
+
+from exceptions import DBException
+from postgres_access import (
+    _copy_line, _copy_text, _split_values_query, _to_positional
+)
+
+
+class CopyLineTest(unittest.TestCase):
+    """Tests of COPY text format encoding of rows.
+    """
+
+    def test_special_characters_are_escaped(self):
+        self.assertEqual(
+            _copy_line(['a\tb', 'c\nd', 'e\\f', 'g\rh']),
+            'a\\tb\tc\\nd\te\\\\f\tg\\rh\n'
+        )
+
+    def test_none_is_null(self):
+        self.assertEqual(_copy_line([None, 1, None]), '\\N\t1\t\\N\n')
+
+    def test_bytes_are_bytea_hex(self):
+        self.assertEqual(_copy_text(b'\x00ab'), '\\x006162')
+        self.assertEqual(_copy_text(bytearray(b'\xff')), '\\xff')
+        self.assertEqual(_copy_line([b'\x00ab']), '\\\\x006162\n')
+
+    def test_list_is_array_literal(self):
+        self.assertEqual(_copy_text([1, None, 'a']), '{"1",NULL,"a"}')
+        self.assertEqual(_copy_text([]), '{}')
+
+    def test_nested_list_is_subarray(self):
+        self.assertEqual(
+            _copy_text([[1, 2], [3, None]]), '{{"1","2"},{"3",NULL}}'
+        )
+
+    def test_array_elements_are_quoted(self):
+        self.assertEqual(
+            _copy_text(['a"b', 'c\\d', 'e,f']), '{"a\\"b","c\\\\d","e,f"}'
+        )
+        self.assertEqual(_copy_line([['a\tb']]), '{"a\\tb"}\n')
+        self.assertEqual(_copy_line([[b'\x01']]), '{"\\\\\\\\x01"}\n')
+
+    def test_unsupported_type(self):
+        with self.assertRaises(DBException):
+            _copy_line([{'a': 1}])
+
+
+class SplitValuesQueryTest(unittest.TestCase):
+    """Tests of splitting query around VALUES placeholder.
+    """
+
+    def test_split(self):
+        self.assertEqual(
+            _split_values_query('INSERT INTO t (a) VALUES %s RETURNING a'),
+            ('INSERT INTO t (a) VALUES ', ' RETURNING a')
+        )
+
+    def test_escaped_percent(self):
+        self.assertEqual(
+            _split_values_query("INSERT INTO t VALUES %s -- 100%%"),
+            ('INSERT INTO t VALUES ', ' -- 100%')
+        )
+
+    def test_placeholder_count(self):
+        with self.assertRaises(DBException):
+            _split_values_query('INSERT INTO t VALUES (1)')
+        with self.assertRaises(DBException):
+            _split_values_query('INSERT INTO t VALUES %s, %s')
+
+
+class ToPositionalTest(unittest.TestCase):
+    """Tests of conversion of placeholders for prepared statements.
+    """
+
+    def test_placeholders_are_numbered(self):
+        self.assertEqual(
+            _to_positional('SELECT * FROM t WHERE a = %s AND b = %s'),
+            ('SELECT * FROM t WHERE a = $1 AND b = $2', 2)
+        )
+
+    def test_escaped_percent(self):
+        self.assertEqual(
+            _to_positional("SELECT %s WHERE a LIKE '100%%'"),
+            ("SELECT $1 WHERE a LIKE '100%'", 1)
+        )
+
+    def test_no_placeholders(self):
+        self.assertEqual(_to_positional('SELECT 1'), ('SELECT 1', 0))
+
+
+if __name__ == '__main__':
+    unittest.main()